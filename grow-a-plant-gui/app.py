@@ -2,9 +2,15 @@
 Plant Monitor GUI Application
 Main Flask application that orchestrates the IoT plant monitoring system
 """
+# Monkey-patch the standard library before anything else imports it
+import eventlet
+eventlet.monkey_patch()
+
+import atexit
+
 from flask import Flask, render_template, jsonify, request
 from flask_socketio import SocketIO
-from threading import Thread
+import orjson
 
 # Import custom modules
 from mqtt_handler import MQTTHandler
@@ -16,7 +22,26 @@ from config_manager import ConfigManager
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'plant-monitor-secret'
-socketio = SocketIO(app, cors_allowed_origins="*")
+
+
+class OrjsonCodec:
+    """Socket.IO packet codec backed by orjson (python-socketio expects str output)"""
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    @staticmethod
+    def loads(data, *args, **kwargs):
+        return orjson.loads(data)
+
+
+socketio = SocketIO(
+    app,
+    async_mode='eventlet',
+    cors_allowed_origins="*",
+    json=OrjsonCodec
+)
 
 # Global state
 app_state = {
@@ -47,6 +72,14 @@ controller_manager = ControllerManager(app_state, socketio)
 config_manager = ConfigManager()
 mqtt_handler = MQTTHandler(MQTT_HOST, MQTT_PORT, app_state, socketio)
 
+# Last serialized /api/status body as (cache key, bytes)
+_status_cache = {'status': (None, None)}
+
+
+def ojsonify(obj):
+    """jsonify() replacement that serializes with orjson"""
+    return app.response_class(orjson.dumps(obj), mimetype='application/json')
+
 
 # ============================================================================
 # ROUTES - Web Pages
@@ -61,65 +94,42 @@ def index():
 @app.route('/api/status')
 def get_status():
     """Get current system status"""
-    return jsonify({
-        'mqtt_broker_running': app_state['mqtt_broker_running'],
-        'simulation_running': app_state['simulation_running'],
-        'controller_running': app_state['controller_running'],
-        'metrics': app_state['metrics']
-    })
-
-
-# ============================================================================
-# ROUTES - MQTT Broker Management
-# ============================================================================
-
-@app.route('/api/start_broker', methods=['POST'])
-def start_broker():
-    """Start MQTT broker (Docker or native Mosquitto)"""
-    result = broker_manager.start()
-    return jsonify(result)
-
-
-@app.route('/api/stop_broker', methods=['POST'])
-def stop_broker():
-    """Stop MQTT broker"""
-    result = broker_manager.stop()
-    return jsonify(result)
-
-
-# ============================================================================
-# ROUTES - Simulator Management
-# ============================================================================
-
-@app.route('/api/start_simulation', methods=['POST'])
-def start_simulation():
-    """Start the external simulator process"""
-    result = simulator_manager.start()
-    return jsonify(result)
-
-
-@app.route('/api/stop_simulation', methods=['POST'])
-def stop_simulation():
-    """Stop the simulator process"""
-    result = simulator_manager.stop()
-    return jsonify(result)
-
-
-# ============================================================================
-# ROUTES - Controller Management
-# ============================================================================
-
-@app.route('/api/start_controller', methods=['POST'])
-def start_controller():
-    """Start the plant controller process"""
-    result = controller_manager.start()
-    return jsonify(result)
+    # Re-serialize only when the metrics or a service state have changed
+    key = (
+        mqtt_handler.metrics_version,
+        app_state['mqtt_broker_running'],
+        app_state['simulation_running'],
+        app_state['controller_running']
+    )
+    cached_key, body = _status_cache['status']
+    if key != cached_key:
+        status = {
+            'mqtt_broker_running': app_state['mqtt_broker_running'],
+            'simulation_running': app_state['simulation_running'],
+            'controller_running': app_state['controller_running'],
+            'metrics': mqtt_handler.get_metrics_snapshot()
+        }
+        body = orjson.dumps(status)
+        _status_cache['status'] = (key, body)
+    return app.response_class(body, mimetype='application/json')
+
+
+# ============================================================================
+# ROUTES - Service Management (broker, simulator, controller)
+# ============================================================================
+
+SERVICE_MANAGERS = {
+    'broker': broker_manager,
+    'simulation': simulator_manager,
+    'controller': controller_manager,
+}
 
 
-@app.route('/api/stop_controller', methods=['POST'])
-def stop_controller():
-    """Stop the controller process"""
-    result = controller_manager.stop()
+@app.route('/api/<any(start, stop):action>_<any(broker, simulation, controller):service>', methods=['POST'])
+def service_action(action, service):
+    """Start or stop the MQTT broker, simulator or plant controller"""
+    manager = SERVICE_MANAGERS[service]
+    result = getattr(manager, action)()
     return jsonify(result)
 
 
@@ -131,7 +141,7 @@ def stop_controller():
 def get_config():
     """Get controller configuration"""
     result = config_manager.get_config()
-    return jsonify(result)
+    return ojsonify(result)
 
 
 @app.route('/api/update_config', methods=['POST'])
@@ -187,10 +197,9 @@ def stop_faucet():
 # Check if broker is already running on startup
 broker_manager.check_status()
 
-# Start MQTT listener in background thread
-listener_thread = Thread(target=mqtt_handler.start_listener)
-listener_thread.daemon = True
-listener_thread.start()
+# Start MQTT listener as a background task on the eventlet hub
+socketio.start_background_task(mqtt_handler.start_listener)
+atexit.register(mqtt_handler.stop_listener)
 
 
 # ============================================================================
@@ -198,4 +207,4 @@ listener_thread.start()
 # ============================================================================
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True, port=5000, allow_unsafe_werkzeug=True)
+    socketio.run(app, debug=True, port=5000)
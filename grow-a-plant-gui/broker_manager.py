@@ -4,30 +4,40 @@ Handles MQTT broker lifecycle (start/stop) via Docker or native Mosquitto
 """
 import subprocess
 import os
+import shutil
 import signal
+import socket
 import time
 
+from process_utils import wait_for_exit
+
+# Address the broker is expected to listen on once started
+BROKER_HOST = 'localhost'
+BROKER_PORT = 1883
+# Seconds to wait for the broker port; Docker may have to pull the image first
+DOCKER_START_TIMEOUT = 30.0
+NATIVE_START_TIMEOUT = 5.0
+
 
 class BrokerManager:
     def __init__(self, app_state, socketio):
         self.app_state = app_state
         self.socketio = socketio
         self.broker_process = None
+        # Resolve the Docker CLI once instead of probing it on every call
+        self._docker_path = shutil.which('docker')
 
     def start(self):
         """Start MQTT broker (Docker or native Mosquitto)"""
         if self.app_state['mqtt_broker_running']:
             return {'success': False, 'message': 'Broker already running'}
 
-        try:
-            # Try Docker first (preferred method - no installation needed)
-            result = subprocess.run(['docker', '--version'], capture_output=True, text=True)
-            if result.returncode == 0:
+        # Try Docker first (preferred method - no installation needed)
+        if self._docker_path:
+            try:
                 return self._start_docker_broker()
-        except FileNotFoundError:
-            pass  # Docker not found, try native approach
-        except Exception as e:
-            print(f"[BROKER] Docker error: {e}")
+            except Exception as e:
+                print(f"[BROKER] Docker error: {e}")
 
         # Fallback: Try native Mosquitto installation
         return self._start_native_broker()
@@ -37,11 +47,11 @@ class BrokerManager:
         print("[BROKER] Starting MQTT broker in Docker container...")
 
         # Check if container already exists and remove it
-        subprocess.run(['docker', 'rm', '-f', 'plant-mqtt-broker'], capture_output=True)
+        subprocess.run([self._docker_path, 'rm', '-f', 'plant-mqtt-broker'], capture_output=True)
 
         # Start new container with proper configuration and process isolation
         docker_cmd = [
-            'docker', 'run', '--name', 'plant-mqtt-broker',
+            self._docker_path, 'run', '--name', 'plant-mqtt-broker',
             '-p', '1883:1883',
             '-v', 'mosquitto_data:/mosquitto/data',
             '--rm',
@@ -62,7 +72,10 @@ class BrokerManager:
         else:
             self.app_state['broker_process'] = subprocess.Popen(docker_cmd)
 
-        time.sleep(2)  # Wait for container to start
+        # Wait for container to accept connections
+        if not self._wait_for_broker(DOCKER_START_TIMEOUT):
+            self._abort_start()
+            return {'success': False, 'message': 'MQTT broker container did not accept connections'}
         self.app_state['mqtt_broker_running'] = True
         self.socketio.emit('broker_status', {'running': True})
         return {'success': True, 'message': 'MQTT broker started in Docker container'}
@@ -85,7 +98,10 @@ class BrokerManager:
                     stderr=subprocess.PIPE
                 )
 
-            time.sleep(1)  # Wait for broker to start
+            # Wait for broker to accept connections
+            if not self._wait_for_broker(NATIVE_START_TIMEOUT):
+                self._abort_start()
+                return {'success': False, 'message': 'Mosquitto did not accept connections'}
             self.app_state['mqtt_broker_running'] = True
             self.socketio.emit('broker_status', {'running': True})
             return {'success': True, 'message': 'MQTT broker started (native)'}
@@ -97,23 +113,49 @@ class BrokerManager:
         except Exception as e:
             return {'success': False, 'message': f'Error starting broker: {str(e)}'}
 
+    def _wait_for_broker(self, timeout):
+        """Block until the broker port accepts TCP connections or the timeout expires"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                with socket.create_connection((BROKER_HOST, BROKER_PORT), timeout=0.1):
+                    return True
+            except OSError:
+                time.sleep(0.05)
+        print(f"[BROKER] Broker not accepting connections after {timeout}s")
+        return False
+
+    def _abort_start(self):
+        """Stop a broker process that never became reachable"""
+        process = self.app_state['broker_process']
+        self.app_state['broker_process'] = None
+        if process is None:
+            return
+        try:
+            process.terminate()
+            if not wait_for_exit(process, 3):
+                process.kill()
+        except Exception as e:
+            print(f"[BROKER] Error stopping unreachable broker: {e}")
+
     def stop(self):
         """Stop MQTT broker"""
         try:
             # Always try to stop Docker container (even if we don't have process handle)
-            print("[BROKER] Attempting to stop Docker container...")
-            try:
-                result = subprocess.run(['docker', 'stop', 'plant-mqtt-broker'],
-                                      capture_output=True, text=True, timeout=10)
-
-                if result.returncode == 0:
-                    print("[BROKER] Successfully stopped Docker container")
-                else:
-                    print(f"[BROKER] Docker stop returned code {result.returncode}: {result.stderr}")
-            except subprocess.TimeoutExpired:
-                print("[BROKER] Docker stop timed out")
-            except Exception as e:
-                print(f"[BROKER] Error stopping Docker: {e}")
+            if self._docker_path:
+                print("[BROKER] Attempting to stop Docker container...")
+                try:
+                    result = subprocess.run([self._docker_path, 'stop', 'plant-mqtt-broker'],
+                                          capture_output=True, text=True, timeout=10)
+
+                    if result.returncode == 0:
+                        print("[BROKER] Successfully stopped Docker container")
+                    else:
+                        print(f"[BROKER] Docker stop returned code {result.returncode}: {result.stderr}")
+                except subprocess.TimeoutExpired:
+                    print("[BROKER] Docker stop timed out")
+                except Exception as e:
+                    print(f"[BROKER] Error stopping Docker: {e}")
 
             # Also try process if we have it (Docker or native)
             if self.app_state['broker_process']:
@@ -121,9 +163,7 @@ class BrokerManager:
                     # Use terminate() for all processes - it's safer
                     self.app_state['broker_process'].terminate()
                     # Give it a moment to terminate gracefully
-                    try:
-                        self.app_state['broker_process'].wait(timeout=3)
-                    except subprocess.TimeoutExpired:
+                    if not wait_for_exit(self.app_state['broker_process'], 3):
                         # Force kill if it doesn't terminate
                         self.app_state['broker_process'].kill()
                     print("[BROKER] Stopped process")
@@ -137,14 +177,15 @@ class BrokerManager:
             self.socketio.emit('broker_status', {'running': False})
 
             # Verify it's actually stopped
-            time.sleep(0.5)
-            try:
-                check_result = subprocess.run(['docker', 'ps', '--filter', 'name=plant-mqtt-broker', '--format', '{{.Names}}'],
-                                             capture_output=True, text=True, timeout=5)
-                if 'plant-mqtt-broker' in check_result.stdout:
-                    return {'success': False, 'message': 'Container is still running. Try: docker stop plant-mqtt-broker'}
-            except Exception as e:
-                print(f"[BROKER] Error checking container status: {e}")
+            if self._docker_path:
+                time.sleep(0.5)
+                try:
+                    check_result = subprocess.run([self._docker_path, 'ps', '--filter', 'name=plant-mqtt-broker', '--format', '{{.Names}}'],
+                                                 capture_output=True, text=True, timeout=5)
+                    if 'plant-mqtt-broker' in check_result.stdout:
+                        return {'success': False, 'message': 'Container is still running. Try: docker stop plant-mqtt-broker'}
+                except Exception as e:
+                    print(f"[BROKER] Error checking container status: {e}")
 
             return {'success': True, 'message': 'MQTT broker stopped'}
 
@@ -157,8 +198,11 @@ class BrokerManager:
 
     def check_status(self):
         """Check if MQTT broker is already running"""
+        if not self._docker_path:
+            return False
+
         try:
-            result = subprocess.run(['docker', 'ps', '--filter', 'name=plant-mqtt-broker', '--format', '{{.Names}}'],
+            result = subprocess.run([self._docker_path, 'ps', '--filter', 'name=plant-mqtt-broker', '--format', '{{.Names}}'],
                                   capture_output=True, text=True)
             if 'plant-mqtt-broker' in result.stdout:
                 self.app_state['mqtt_broker_running'] = True
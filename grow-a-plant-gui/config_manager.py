@@ -2,9 +2,10 @@
 Configuration Manager Module
 Handles reading and updating controller configuration files
 """
-import json
 import os
 
+import orjson
+
 
 class ConfigManager:
     def __init__(self):
@@ -14,12 +15,26 @@ class ConfigManager:
             'iot-grow-a-plant-controller',
             'grow_a_plant_config.json'
         )
+        # Parsed config, reused until the file's mtime changes
+        self._cache = None
+        self._cache_mtime = 0
+
+    def _load_config(self):
+        """Return the parsed config, re-reading the file only when it has changed"""
+        mtime = os.stat(self.config_path).st_mtime_ns
+        if self._cache is not None and mtime == self._cache_mtime:
+            return self._cache
+
+        with open(self.config_path, 'rb') as f:
+            data = f.read()
+        self._cache = orjson.loads(data)
+        self._cache_mtime = mtime
+        return self._cache
 
     def get_config(self):
         """Load and return the controller configuration"""
         try:
-            with open(self.config_path, 'r') as f:
-                config = json.load(f)
+            config = self._load_config()
             return {'success': True, 'config': config}
         except Exception as e:
             return {'success': False, 'message': f'Error loading config: {str(e)}'}
@@ -27,15 +42,23 @@ class ConfigManager:
     def update_config(self, data):
         """Update the controller configuration"""
         try:
-            with open(self.config_path, 'r') as f:
-                config = json.load(f)
+            config = self._load_config()
 
             # Update thresholds
             config['message_flows'][0]['thresholds'] = data['thresholds']
 
-            with open(self.config_path, 'w') as f:
-                json.dump(config, f, indent=2)
+            payload = orjson.dumps(config, option=orjson.OPT_INDENT_2)
+
+            # Write to a temp file and swap it in atomically so a crash mid-write
+            # can never leave a truncated config behind
+            tmp_path = self.config_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, self.config_path)
+
+            self._cache_mtime = os.stat(self.config_path).st_mtime_ns
 
             return {'success': True, 'message': 'Configuration updated! Restart controller to apply changes.'}
         except Exception as e:
+            self._cache = None  # Cached copy may hold the unsaved change
             return {'success': False, 'message': f'Error updating config: {str(e)}'}
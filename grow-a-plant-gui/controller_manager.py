@@ -6,7 +6,8 @@ import subprocess
 import os
 import signal
 import time
-from threading import Thread
+
+from process_utils import stream_output, wait_for_exit
 
 
 class ControllerManager:
@@ -40,10 +41,8 @@ class ControllerManager:
                     stderr=subprocess.STDOUT
                 )
 
-            # Start thread to stream output
-            output_thread = Thread(target=self._stream_output, args=(self.app_state['controller_process'],))
-            output_thread.daemon = True
-            output_thread.start()
+            # Stream output on a green thread - the pipe read yields to the eventlet hub
+            self.socketio.start_background_task(self._stream_output, self.app_state['controller_process'])
 
             time.sleep(2)  # Wait a bit longer to see if it crashes
 
@@ -80,9 +79,7 @@ class ControllerManager:
                     # On Linux/Mac, terminate the process gracefully
                     self.app_state['controller_process'].terminate()
                     # If terminate doesn't work after 2 seconds, force kill
-                    try:
-                        self.app_state['controller_process'].wait(timeout=2)
-                    except subprocess.TimeoutExpired:
+                    if not wait_for_exit(self.app_state['controller_process'], 2):
                         print("[CONTROLLER] Process didn't terminate, forcing kill...")
                         self.app_state['controller_process'].kill()
 
@@ -97,14 +94,5 @@ class ControllerManager:
             return {'success': False, 'message': f'Error stopping controller: {str(e)}'}
 
     def _stream_output(self, process):
-        """Stream controller output to console"""
-        for line in iter(process.stdout.readline, b''):
-            if line:
-                try:
-                    # Try UTF-8 first, fallback to latin-1 for Windows special chars
-                    log_line = line.decode('utf-8', errors='replace').strip()
-                except:
-                    log_line = line.decode('latin-1', errors='replace').strip()
-                print(f"[CONTROLLER] {log_line}")
-                # Also emit to frontend
-                self.socketio.emit('controller_log', {'message': log_line})
+        """Stream controller output to console and frontend"""
+        stream_output(process, 'CONTROLLER', self.socketio, 'controller_log_batch')
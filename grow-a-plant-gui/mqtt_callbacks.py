@@ -0,0 +1,30 @@
+"""
+MQTT Callbacks Module
+Typed payload parsers used on the per-message MQTT hot path.
+Kept free of Flask/paho imports and clean under `mypy --strict`, so it can be
+compiled with `mypyc mqtt_callbacks.py`
+"""
+from typing import Any, Callable
+
+import orjson
+
+# orjson accepts the raw payload bytes, no .decode() needed
+_json_loads: Callable[[bytes], Any] = orjson.loads
+
+
+def parse_metric_value(payload: bytes) -> int | float:
+    """Extract the numeric value from a {"value": N} metric payload"""
+    data: dict[str, int | float] = _json_loads(payload)
+    return data.get('value', 0)
+
+
+def parse_faucet_command(payload: bytes) -> int:
+    """Parse a faucet command (0=OFF, 1=ON) from either supported format"""
+    data = _json_loads(payload)
+    if isinstance(data, dict):
+        # Controller format: {"command": 1}
+        return int(data.get('command', 0))
+    if isinstance(data, (int, str)):
+        # GUI format: "1" or 1
+        return int(data)
+    return 0
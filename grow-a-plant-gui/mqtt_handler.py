@@ -3,8 +3,54 @@ MQTT Handler Module
 Handles all MQTT communication including listening to topics and processing messages
 """
 import paho.mqtt.client as mqtt
-import json
+import functools
+import logging
+import queue
+import socket
+import sys
+import threading
 import time
+from logging.handlers import QueueHandler, QueueListener
+
+from mqtt_callbacks import parse_faucet_command, parse_metric_value
+
+logger = logging.getLogger('mqtt')
+
+
+def _configure_logger():
+    """Hand log records to a queue so the MQTT thread never writes to stdout itself"""
+    log_queue = queue.Queue(-1)
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter('%(message)s'))
+    listener = QueueListener(log_queue, console_handler)
+    listener.start()
+
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)  # Per-message sensor records are DEBUG
+    logger.propagate = False
+    return listener
+
+
+_log_listener = _configure_logger()
+
+# Topic -> metrics key for sensor data and controller outputs
+METRIC_TOPICS = {
+    'sensors/soil_moisture': 'soil_moisture',
+    'sensors/temperature': 'temperature',
+    'plant/watering_hours': 'watering_hours',
+    'plant/currently_watering': 'currently_watering',
+    'plant/health': 'plant_health',
+}
+FAUCET_COMMAND_TOPIC = 'faucet/command'
+
+# Exact topic filters, so the broker drops everything the dashboard ignores
+SUBSCRIPTIONS = [(topic, 0) for topic in METRIC_TOPICS] + [(FAUCET_COMMAND_TOPIC, 0)]
+
+# Kernel socket buffer size requested for the MQTT connection (bytes)
+SOCKET_BUFFER_SIZE = 1 << 20
+
+# Minimum interval between 'metrics_update' emits (10 Hz cap, nanoseconds)
+METRICS_EMIT_INTERVAL_NS = 100_000_000
 
 
 class MQTTHandler:
@@ -14,98 +60,162 @@ class MQTTHandler:
         self.app_state = app_state
         self.socketio = socketio
         self.client = None
+        self._stop_event = threading.Event()
+
+        # Guards app_state['metrics'] between the MQTT thread and Flask handlers
+        self._metrics_lock = threading.Lock()
+        # Bumped on every metrics write so readers can cache derived data
+        self.metrics_version = 0
 
-    def on_message(self, client, userdata, message):
-        """Handle incoming MQTT messages"""
+        # Emits are rate limited; updates inside the interval are coalesced
+        self._emit_lock = threading.Lock()
+        self._last_emit_ns = 0
+        self._emit_pending = False
+
+    def _on_metric(self, metric, client, userdata, message):
+        """Handle sensor data from simulation and plant metrics from controller"""
         try:
-            payload = json.loads(message.payload.decode())
-            topic = message.topic
-
-            # Handle sensor data from simulation
-            if "sensors/soil_moisture" in topic:
-                self.app_state['metrics']['soil_moisture'] = payload.get('value', 0)
-                print(f"[MQTT] Received soil moisture: {payload.get('value')}%")
-            elif "sensors/temperature" in topic:
-                self.app_state['metrics']['temperature'] = payload.get('value', 0)
-                print(f"[MQTT] Received temperature: {payload.get('value')}°C")
-            elif "faucet/command" in topic:
-                # Track faucet status - handle both formats
-                if isinstance(payload, dict):
-                    # Controller format: {"command": 1}
-                    faucet_cmd = int(payload.get('command', 0))
-                elif isinstance(payload, (int, str)):
-                    # GUI format: "1" or 1
-                    faucet_cmd = int(payload)
-                else:
-                    faucet_cmd = 0
+            value = parse_metric_value(message.payload)
+            logger.debug("[MQTT] Received %s: %s", metric, value)
+            with self._metrics_lock:
+                if self.app_state['metrics'][metric] == value:
+                    return  # Unchanged - nothing new to send to the dashboard
+                self.app_state['metrics'][metric] = value
+                self.metrics_version += 1
+
+            self._schedule_emit()
+        except Exception as e:
+            logger.error("Message processing error: %s", e)
 
+    def _on_faucet_command(self, client, userdata, message):
+        """Track faucet status from manual and controller commands"""
+        try:
+            faucet_cmd = parse_faucet_command(message.payload)
+            status = "ON" if faucet_cmd == 1 else "OFF"
+            logger.info("[MQTT] Faucet command: %s", status)
+            with self._metrics_lock:
+                if self.app_state['metrics']['faucet_status'] == faucet_cmd:
+                    return
                 self.app_state['metrics']['faucet_status'] = faucet_cmd
-                status = "ON" if faucet_cmd == 1 else "OFF"
-                print(f"[MQTT] Faucet command: {status}")
-            elif "watering_hours" in topic:
-                self.app_state['metrics']['watering_hours'] = payload.get('value', 0)
-            elif "currently_watering" in topic:
-                self.app_state['metrics']['currently_watering'] = payload.get('value', 0)
-            elif "health" in topic:
-                self.app_state['metrics']['plant_health'] = payload.get('value', 0)
-
-            self.socketio.emit('metrics_update', self.app_state['metrics'])
+                self.metrics_version += 1
+
+            self._schedule_emit()
         except Exception as e:
-            print(f"Message processing error: {e}")
+            logger.error("Message processing error: %s", e)
+
+    def _schedule_emit(self):
+        """Emit metrics now, or once the rate-limit interval has elapsed"""
+        now = time.monotonic_ns()
+        with self._emit_lock:
+            if self._emit_pending:
+                return  # A deferred emit will pick up this change
+            if now - self._last_emit_ns < METRICS_EMIT_INTERVAL_NS:
+                self._emit_pending = True
+                self.socketio.start_background_task(self._deferred_emit)
+                return
+            self._last_emit_ns = now
+        self.socketio.emit('metrics_update', self.get_metrics_snapshot())
+
+    def _deferred_emit(self):
+        """Send one coalesced emit at the end of the current rate-limit interval"""
+        delay_ns = self._last_emit_ns + METRICS_EMIT_INTERVAL_NS - time.monotonic_ns()
+        if delay_ns > 0:
+            self.socketio.sleep(delay_ns / 1e9)
+        with self._emit_lock:
+            self._emit_pending = False
+            self._last_emit_ns = time.monotonic_ns()
+        self.socketio.emit('metrics_update', self.get_metrics_snapshot())
+
+    def get_metrics_snapshot(self):
+        """Return a point-in-time copy of the current metrics"""
+        with self._metrics_lock:
+            return dict(self.app_state['metrics'])
+
+    def on_connect(self, client, userdata, flags, reason_code, properties=None):
+        """Subscribe to topics on every (re)connection"""
+        if reason_code == 0:
+            self._tune_socket(client.socket())
+
+            # Sensor data from simulation, plant metrics from controller and faucet commands
+            client.subscribe(SUBSCRIPTIONS)
+            logger.info("[MQTT] Connected and subscribed to topics: %s",
+                        ", ".join(topic for topic, _ in SUBSCRIPTIONS))
 
-    def on_disconnect(self, client, userdata, rc, properties=None):
+    def _tune_socket(self, sock):
+        """Disable Nagle and enlarge kernel buffers on the broker connection"""
+        if sock is None:
+            return
+        try:
+            # Small PUBLISH frames (faucet commands) go out immediately
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Larger buffers absorb sensor bursts without kernel backpressure
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+        except OSError as e:
+            logger.warning("[MQTT] Could not tune broker socket: %s", e)
+
+    def on_disconnect(self, client, userdata, flags, rc, properties=None):
         """Handle MQTT disconnection"""
         if rc != 0:
-            print(f"[MQTT] Unexpected disconnection (code: {rc}). Will attempt to reconnect...")
+            logger.warning("[MQTT] Unexpected disconnection (code: %s). Will attempt to reconnect...", rc)
 
     def start_listener(self):
-        """Start MQTT listener in background thread"""
-        while True:
+        """Connect the shared MQTT client and supervise it until stop_listener() is called"""
+        while not self._stop_event.is_set():
             try:
-                print("[MQTT] Attempting to connect to broker...")
-                self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-                self.client.on_message = self.on_message
-                self.client.on_disconnect = self.on_disconnect
+                logger.info("[MQTT] Attempting to connect to broker...")
+                client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+                client.on_connect = self.on_connect
+                client.on_disconnect = self.on_disconnect
+
+                # Route each topic straight to its handler via paho's topic matcher
+                for topic, metric in METRIC_TOPICS.items():
+                    client.message_callback_add(topic, functools.partial(self._on_metric, metric))
+                client.message_callback_add(FAUCET_COMMAND_TOPIC, self._on_faucet_command)
 
                 # Try to connect with timeout
                 try:
-                    self.client.connect(self.host, self.port, 60)
+                    client.connect(self.host, self.port, 60)
                 except (ConnectionRefusedError, OSError) as e:
-                    print(f"[MQTT] Broker not available: {e}. Retrying in 5 seconds...")
-                    time.sleep(5)
+                    logger.warning("[MQTT] Broker not available: %s. Retrying in 5 seconds...", e)
+                    self._stop_event.wait(5)
                     continue
 
-                # If connection successful, subscribe
-                self.client.subscribe("sensors/#")  # Subscribe to sensor data from simulation
-                self.client.subscribe("plant/#")    # Subscribe to plant metrics from controller
-                self.client.subscribe("faucet/#")   # Subscribe to faucet commands
-                print("[MQTT] Connected and subscribed to topics: sensors/#, plant/#, faucet/#")
+                # Network loop runs in paho's own thread and reconnects automatically;
+                # the same client is reused for publishing from Flask handlers
+                self.client = client
+                self.client.loop_start()
 
-                # Run loop - this will block until disconnected
-                self.client.loop_forever()
+                # Nothing left to do here until shutdown
+                self._stop_event.wait()
 
-            except KeyboardInterrupt:
-                print("[MQTT] Listener interrupted by user")
-                break
             except Exception as e:
-                print(f"[MQTT] Listener error: {e}")
-                time.sleep(5)
+                logger.error("[MQTT] Listener error: %s", e)
+                self._stop_event.wait(5)
+
+    def stop_listener(self):
+        """Stop the MQTT network loop and disconnect from the broker"""
+        self._stop_event.set()
+        if self.client:
+            self.client.disconnect()
+            self.client.loop_stop()
+            logger.info("[MQTT] Listener stopped")
 
     def publish_faucet_command(self, command):
         """Publish a faucet command (0=OFF, 1=ON)"""
+        if not self.client or not self.client.is_connected():
+            logger.warning("[MQTT] Broker not available for faucet command")
+            return False
+
         try:
-            client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-            client.connect(self.host, self.port, 60)
-            # Publish with QoS 1 to ensure delivery
-            result = client.publish("faucet/command", str(command), qos=1)
-            # Wait for the message to be sent before disconnecting
-            result.wait_for_publish(timeout=2.0)
-            print(f"[MQTT-HANDLER] Published manual faucet command: {command} (msg_id: {result.mid})")
-            client.disconnect()
+            # QoS 0 skips the PUBACK round-trip; retaining the command gives late
+            # subscribers (e.g. a restarted simulator) the current faucet state
+            result = self.client.publish(FAUCET_COMMAND_TOPIC, str(command), qos=0, retain=True)
+            if result.rc != mqtt.MQTT_ERR_SUCCESS:
+                logger.error("[MQTT] Error publishing faucet command (code: %s)", result.rc)
+                return False
+            logger.info("[MQTT-HANDLER] Published manual faucet command: %s (msg_id: %s)", command, result.mid)
             return True
-        except (ConnectionRefusedError, OSError) as e:
-            print(f"[MQTT] Broker not available for faucet command: {e}")
-            return False
         except Exception as e:
-            print(f"[MQTT] Error publishing faucet command: {e}")
+            logger.error("[MQTT] Error publishing faucet command: %s", e)
             return False
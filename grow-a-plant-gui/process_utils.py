@@ -0,0 +1,97 @@
+"""
+Process Utilities Module
+Helpers shared by the process managers for waiting on child processes
+and streaming their output
+"""
+import os
+import select
+import subprocess
+import sys
+import threading
+from collections import deque
+
+# Interval between batched log emits to the frontend (seconds)
+LOG_FLUSH_INTERVAL = 0.05
+# Oldest unsent lines are dropped once this many are waiting
+LOG_BUFFER_SIZE = 500
+
+
+def wait_for_exit(process, timeout):
+    """Wait up to `timeout` seconds for a process to exit, return True if it has exited"""
+    if process.poll() is not None:
+        return True
+
+    # Linux 5.3+: a pidfd becomes readable the moment the process exits
+    if sys.platform.startswith('linux') and hasattr(os, 'pidfd_open'):
+        try:
+            pidfd = os.pidfd_open(process.pid)
+        except OSError:
+            pidfd = None  # Older kernel - fall back to subprocess polling
+        if pidfd is not None:
+            try:
+                select.select([pidfd], [], [], timeout)
+            finally:
+                os.close(pidfd)
+            return process.poll() is not None
+
+    # Everywhere else (macOS, Windows, old kernels) fall back to Popen.wait(),
+    # which eventlet's monkey_patch() turns into a green wait that yields to the hub
+    try:
+        process.wait(timeout=timeout)
+        return True
+    except subprocess.TimeoutExpired:
+        return False
+
+
+def stream_output(process, tag, socketio, event):
+    """Echo a child's output to the console and forward it to the frontend in batches"""
+    batch = _LogBatch(socketio, event)
+    fd = process.stdout.fileno()
+    buf = b''
+    while True:
+        chunk = os.read(fd, 4096)
+        if not chunk:
+            break
+        buf += chunk
+        *raw_lines, buf = buf.split(b'\n')
+        if raw_lines:
+            _forward_lines(raw_lines, tag, batch)
+    if buf:
+        _forward_lines([buf], tag, batch)
+
+
+def _forward_lines(raw_lines, tag, batch):
+    """Decode complete lines, print them in one write and queue them for the frontend"""
+    lines = [line.decode('utf-8', errors='replace').strip() for line in raw_lines]
+    print('\n'.join(f"[{tag}] {line}" for line in lines))
+    batch.add(lines)
+
+
+class _LogBatch:
+    """Collects log lines and emits them as one batch per flush interval"""
+
+    def __init__(self, socketio, event):
+        self.socketio = socketio
+        self.event = event
+        self._lines = deque(maxlen=LOG_BUFFER_SIZE)
+        self._lock = threading.Lock()
+        self._flush_pending = False
+
+    def add(self, lines):
+        """Queue lines, starting a flush if this is the first line of a batch"""
+        with self._lock:
+            self._lines.extend(lines)
+            if self._flush_pending:
+                return  # The scheduled flush will pick these up
+            self._flush_pending = True
+        self.socketio.start_background_task(self._flush)
+
+    def _flush(self):
+        """Emit everything queued once the flush interval has elapsed"""
+        self.socketio.sleep(LOG_FLUSH_INTERVAL)
+        with self._lock:
+            lines = list(self._lines)
+            self._lines.clear()
+            self._flush_pending = False
+        if lines:
+            self.socketio.emit(self.event, {'lines': lines})
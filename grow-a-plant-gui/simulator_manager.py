@@ -5,8 +5,8 @@ Handles the lifecycle of the external simulator process
 import subprocess
 import os
 import signal
-import time
-from threading import Thread
+
+from process_utils import stream_output, wait_for_exit
 
 
 class SimulatorManager:
@@ -26,7 +26,7 @@ class SimulatorManager:
 
             if os.name == 'nt':  # Windows
                 self.app_state['simulation_process'] = subprocess.Popen(
-                    ['python', 'simulator.py'],
+                    ['python', '-u', 'simulator.py'],
                     cwd=simulator_path,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
@@ -34,21 +34,17 @@ class SimulatorManager:
                 )
             else:  # Linux/Mac
                 self.app_state['simulation_process'] = subprocess.Popen(
-                    ['python', 'simulator.py'],
+                    ['python', '-u', 'simulator.py'],
                     cwd=simulator_path,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT
                 )
 
-            # Start thread to stream simulator output
-            output_thread = Thread(target=self._stream_output, args=(self.app_state['simulation_process'],))
-            output_thread.daemon = True
-            output_thread.start()
-
-            time.sleep(2)  # Wait to see if it crashes
+            # Stream output on a green thread - the pipe read yields to the eventlet hub
+            self.socketio.start_background_task(self._stream_output, self.app_state['simulation_process'])
 
-            # Check if process is still running
-            if self.app_state['simulation_process'].poll() is not None:
+            # Wait to see if it crashes - returns early as soon as the process exits
+            if wait_for_exit(self.app_state['simulation_process'], 2.0):
                 return {'success': False, 'message': 'Simulator crashed on startup. Check Flask console for logs.'}
 
             self.app_state['simulation_running'] = True
@@ -79,9 +75,7 @@ class SimulatorManager:
                     # On Linux/Mac, terminate the process gracefully
                     self.app_state['simulation_process'].terminate()
                     # If terminate doesn't work after 2 seconds, force kill
-                    try:
-                        self.app_state['simulation_process'].wait(timeout=2)
-                    except subprocess.TimeoutExpired:
+                    if not wait_for_exit(self.app_state['simulation_process'], 2):
                         print("[SIMULATOR] Process didn't terminate, forcing kill...")
                         self.app_state['simulation_process'].kill()
 
@@ -96,14 +90,5 @@ class SimulatorManager:
             return {'success': False, 'message': f'Error stopping simulator: {str(e)}'}
 
     def _stream_output(self, process):
-        """Stream simulator output to console"""
-        for line in iter(process.stdout.readline, b''):
-            if line:
-                try:
-                    # Try UTF-8 first, fallback to latin-1 for Windows special chars
-                    log_line = line.decode('utf-8', errors='replace').strip()
-                except:
-                    log_line = line.decode('latin-1', errors='replace').strip()
-                print(f"[SIMULATOR] {log_line}")
-                # Also emit to frontend
-                self.socketio.emit('simulator_log', {'message': log_line})
+        """Stream simulator output to console and frontend"""
+        stream_output(process, 'SIMULATOR', self.socketio, 'simulator_log_batch')
@@ -1,17 +1,21 @@
 import asyncio
-import json
+import logging
 import platform
-import os
+import sys
 import argparse
 from src.messaging.broker_client import IoTMessageBroker
 from src.monitors.monitor_builder import MonitorFactory
-from src.core.system_logger import SystemLogger
-
-# Optional debug output for asyncio
-os.environ["PYTHONASYNCIODEBUG"] = "1"
+from src.core.system_logger import setup_logging
+from src.core.config_loader import load_config
 
 if platform.system() == "Windows":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    uvloop = None
+else:
+    try:
+        import uvloop
+    except ImportError:  # uvloop is optional - fall back to the default event loop
+        uvloop = None
 
 async def main():
     # Parse command line arguments
@@ -24,18 +28,21 @@ async def main():
     
     args = parser.parse_args()
     
-    # Setup logger
-    logger = SystemLogger(__name__, console_level=args.debug_level).get_logger()
+    # Setup logging once for every module
+    setup_logging(args.debug_level)
+    logger = logging.getLogger(__name__)
+    
+    # asyncio debug mode (slow-callback warnings, coroutine tracebacks) only when debugging
+    if args.debug_level == "DEBUG":
+        asyncio.get_running_loop().set_debug(True)
     
     # Load configuration
-    with open(args.config, "r") as f:
-        config = json.load(f)
+    config = load_config(args.config)
     
     # Setup the IoT message broker
     bus = IoTMessageBroker(
-        host=config["broker"]["host"],
-        port=config["broker"]["port"],
-        debug_level=args.debug_level
+        host=config.broker.host,
+        port=config.broker.port
     )
     logger.info("[MAIN] IoT Message Broker initialized")
     
@@ -45,13 +52,13 @@ async def main():
 
     # Create monitors from configuration
     monitors = []
-    for monitor_config in config["message_flows"]:
+    for monitor_config in config.message_flows:
         try:
             monitor = MonitorFactory.create_monitor(monitor_config, bus)
             monitors.append(monitor)
-            logger.info(f"[MAIN] Created monitor: {monitor_config['name']}")
+            logger.info(f"[MAIN] Created monitor: {monitor_config.name}")
         except Exception as e:
-            logger.error(f"[MAIN] Error creating monitor {monitor_config['name']}: {e}")
+            logger.error(f"[MAIN] Error creating monitor {monitor_config.name}: {e}")
     
     # Start all monitors
     monitor_tasks = []
@@ -79,4 +86,11 @@ async def main():
                 logger.error(f"[MAIN] Error stopping monitor {monitor.name}: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is None:
+        asyncio.run(main())
+    elif sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            runner.run(main())
+    else:
+        uvloop.install()
+        asyncio.run(main())
@@ -0,0 +1,29 @@
+from typing import Dict, List, Union
+import msgspec
+
+
+class BrokerConfig(msgspec.Struct):
+    """MQTT broker connection settings."""
+    host: str = "localhost"
+    port: int = 1883
+
+
+class FlowConfig(msgspec.Struct):
+    """Configuration of a single message flow (monitor)."""
+    type: str
+    name: str
+    input: Dict[str, str]
+    output: Dict[str, str]
+    thresholds: Dict[str, Union[int, float]]
+
+
+class ControllerConfig(msgspec.Struct):
+    """Top-level controller configuration."""
+    broker: BrokerConfig
+    message_flows: List[FlowConfig]
+
+
+def load_config(path: str) -> ControllerConfig:
+    """Load and validate the controller configuration file."""
+    with open(path, "rb") as f:
+        return msgspec.json.decode(f.read(), type=ControllerConfig)
@@ -40,3 +40,9 @@ class SystemLogger:
     
     def get_logger(self) -> logging.Logger:
         return self.logger
+
+
+def setup_logging(level: str = "INFO", log_file: Optional[str] = None) -> None:
+    """Configure the root logger once; modules log through logging.getLogger(__name__)."""
+    # An empty name selects the root logger, which every module logger propagates to
+    SystemLogger(name="", log_file=log_file, log_level=level, console_level=level)
@@ -1,114 +1,149 @@
-import json
+import asyncio
+import logging
 from typing import Any, Callable
-import paho.mqtt.client as mqtt
-from threading import Thread
-import time
+import aiomqtt
+import orjson
 
-from src.core.system_logger import SystemLogger
+CONNECT_TIMEOUT = 5    # seconds
+RECONNECT_DELAY = 5    # seconds between reconnect attempts
 
 class IoTMessageBroker:
-    """IoT message broker for MQTT publish/subscribe communication using paho-mqtt."""
+    """IoT message broker for MQTT publish/subscribe communication using aiomqtt."""
 
-    def __init__(self, host="127.0.0.1", port=1883, debug_level="INFO"):
+    def __init__(self, host="127.0.0.1", port=1883):
         """Initialize MQTT broker connection."""
         self.host = host
         self.port = port
-        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        self.client = None
         self.callbacks = {}
+        self._ignore_retained = {}  # topic -> drop retained messages
         self.connected = False
-        self.loop = None  # Store the event loop
-
-        self.logger = SystemLogger(
-            name=__name__,
-            log_file=None,
-            log_level="INFO",
-            console_level=debug_level,
-        ).get_logger()
-        
-        # Set up MQTT callbacks
-        self.client.on_connect = self._on_connect
-        self.client.on_message = self._on_message
-
-    def _on_connect(self, client, userdata, flags, reason_code, properties):
-        """Callback when connected to MQTT broker."""
+        self._listener = None  # Task receiving messages on the event loop
+        self._pending_subs = {}  # topic -> qos, sent together in one SUBSCRIBE
+        self._flush_handle = None
+        self._flush_task = None
+
+        self.logger = logging.getLogger(__name__)
+
+    async def _open(self) -> None:
+        """Open a new client connection and resubscribe to all topics."""
+        client = aiomqtt.Client(self.host, self.port, keepalive=60, timeout=CONNECT_TIMEOUT)
+        await client.__aenter__()
+        self.client = client
         self.connected = True
-        self.logger.info(f"[MQTT] Connected to {self.host}:{self.port}")
-        
-        # Resubscribe to all topics
-        for topic in self.callbacks.keys():
-            client.subscribe(topic)
-            self.logger.info(f"[MQTT SUBSCRIBE] Subscribed to {topic}")
-
-    def _on_message(self, client, userdata, message):
-        """Callback when message received."""
-        topic = message.topic
-        
-        if topic in self.callbacks:
+        self.logger.info("[MQTT] Connected to %s:%s", self.host, self.port)
+
+        # Resubscribe to all topics in a single packet
+        if self.callbacks:
+            await client.subscribe([(topic, 0) for topic in self.callbacks])
+            self.logger.info("[MQTT SUBSCRIBE] Subscribed to %s", ", ".join(self.callbacks))
+
+    async def _close(self) -> None:
+        """Close the current client connection, if any."""
+        self.connected = False
+        client, self.client = self.client, None
+        if client is not None:
+            try:
+                await client.__aexit__(None, None, None)
+            except aiomqtt.MqttError:
+                pass  # Already disconnected
+
+    async def _dispatch(self) -> None:
+        """Receive messages and reconnect whenever the connection drops."""
+        while True:
+            try:
+                async for message in self.client.messages:
+                    await self._on_message(message)
+            except aiomqtt.MqttError as e:
+                self.logger.warning("[MQTT] Connection lost: %s", e)
+            await self._close()
+
+            while not self.connected:
+                await asyncio.sleep(RECONNECT_DELAY)
+                try:
+                    await self._open()
+                except aiomqtt.MqttError as e:
+                    self.logger.error("[MQTT] Reconnect failed: %s", e)
+
+    async def _on_message(self, message: aiomqtt.Message) -> None:
+        """Handle a received message."""
+        topic = message.topic.value
+        if message.retain and self._ignore_retained.get(topic, True):
+            return
+        callback = self.callbacks.get(topic)
+
+        if callback is not None:
             try:
-                payload = json.loads(message.payload.decode())
-                self.logger.debug(f"[MQTT INCOMING] Topic: {topic}, Payload: {payload}")
-                
-                # Call the registered callback - schedule it in the event loop
-                callback = self.callbacks[topic]
-                if self.loop:
-                    import asyncio
-                    asyncio.run_coroutine_threadsafe(callback(payload), self.loop)
-            except json.JSONDecodeError:
-                self.logger.error(f"[MQTT] Non-JSON payload on {topic}: {message.payload}")
+                payload = orjson.loads(message.payload)
+                self.logger.debug("[MQTT INCOMING] Topic: %s, Payload: %s", topic, payload)
+                await callback(payload)
+            except orjson.JSONDecodeError:
+                self.logger.error("[MQTT] Non-JSON payload on %s: %s", topic, message.payload)
             except Exception as e:
-                self.logger.error(f"[MQTT] Error processing message: {e}")
+                self.logger.error("[MQTT] Error processing message: %s", e)
 
     async def publish(self, topic: str, message: dict, qos: int = 0, retain: bool = False) -> None:
         """Publish JSON message to MQTT topic."""
         try:
-            payload = json.dumps(message)
-            result = self.client.publish(topic, payload, qos=qos, retain=retain)
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                self.logger.info(f"[MQTT PUBLISH] Sent to {topic}: {payload}")
-            else:
-                self.logger.error(f"[MQTT] Publish failed with code {result.rc}")
+            payload = orjson.dumps(message)
+            await self.client.publish(topic, payload, qos=qos, retain=retain)
+            self.logger.info("[MQTT PUBLISH] Sent to %s: %s", topic, message)
+        except Exception as e:
+            self.logger.error("[MQTT] Failed to publish to %s: %s", topic, e)
+
+    async def publish_value(self, topic: str, value: float, qos: int = 0, retain: bool = False) -> None:
+        """Publish a numeric {"value": N} message without going through the JSON encoder."""
+        try:
+            # repr() of an int/float is valid JSON for the finite values sensors produce
+            await self.client.publish(topic, b'{"value":%a}' % value, qos=qos, retain=retain)
+            self.logger.info("[MQTT PUBLISH] Sent to %s: {'value': %r}", topic, value)
         except Exception as e:
-            self.logger.error(f"[MQTT] Failed to publish to {topic}: {e}")
+            self.logger.error("[MQTT] Failed to publish to %s: %s", topic, e)
 
     async def subscribe(self, topic: str, callback: Callable, *args: Any, qos: int = 0, ignore_retained: bool = True, **kwargs: Any) -> None:
         """Subscribe to MQTT topic with callback."""
+        self.callbacks[topic] = callback
+        self._ignore_retained[topic] = ignore_retained
+        self._pending_subs[topic] = qos
+
+        # Subscriptions made in the same loop iteration share one SUBSCRIBE
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush_soon)
+
+    def _flush_soon(self) -> None:
+        """Start sending the queued subscriptions."""
+        self._flush_handle = None
+        self._flush_task = asyncio.create_task(self._flush_subscriptions())
+
+    async def _flush_subscriptions(self) -> None:
+        """Send all queued subscriptions in one SUBSCRIBE packet."""
+        topics, self._pending_subs = list(self._pending_subs.items()), {}
+        # While disconnected, _open() resubscribes to every topic on reconnect
+        if not topics or not self.connected:
+            return
         try:
-            self.callbacks[topic] = callback
-            if self.connected:
-                self.client.subscribe(topic, qos=qos)
-                self.logger.info(f"[MQTT SUBSCRIBE] Subscribed to {topic}")
+            await self.client.subscribe(topics)
+            self.logger.info("[MQTT SUBSCRIBE] Subscribed to %s", ", ".join(topic for topic, _ in topics))
         except Exception as e:
-            self.logger.error(f"[MQTT] Failed to subscribe to {topic}: {e}")
+            self.logger.error("[MQTT] Failed to subscribe to %s: %s", ", ".join(topic for topic, _ in topics), e)
 
     async def connect(self) -> None:
         """Establish MQTT connection."""
         try:
-            import asyncio
-            # Store the event loop for scheduling callbacks
-            self.loop = asyncio.get_event_loop()
-            
-            self.client.connect(self.host, self.port, 60)
-            self.client.loop_start()
-            self.logger.info(f"[MQTT] Connecting to {self.host}:{self.port}")
-            
-            # Wait for connection
-            timeout = 5
-            start = time.time()
-            while not self.connected and (time.time() - start) < timeout:
-                await asyncio.sleep(0.1)
-                
-            if not self.connected:
-                raise Exception("Connection timeout")
+            self.logger.info("[MQTT] Connecting to %s:%s", self.host, self.port)
+            await self._open()
+            self._listener = asyncio.create_task(self._dispatch())
         except Exception as e:
-            self.logger.error(f"[MQTT] Connection failed: {e}")
+            self.logger.error("[MQTT] Connection failed: %s", e)
             raise
-    
+
     async def disconnect(self) -> None:
         """Disconnect from MQTT broker."""
         try:
-            self.client.loop_stop()
-            self.client.disconnect()
-            self.connected = False
+            if self._listener is not None:
+                self._listener.cancel()
+                self._listener = None
+            await self._close()
             self.logger.info("[MQTT] Disconnected")
         except Exception as e:
-            self.logger.error(f"[MQTT] Disconnect error: {e}")
+            self.logger.error("[MQTT] Disconnect error: %s", e)
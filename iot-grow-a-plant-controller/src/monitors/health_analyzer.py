@@ -1,20 +1,33 @@
 import asyncio
-from typing import Dict, Any
+import logging
+from typing import Dict, Any, List, Optional, Tuple
 from .sensor_base import SensorProcessor
-from src.core.system_logger import SystemLogger
+from src.core.config_loader import FlowConfig
 
-LOGGER = SystemLogger(
-    name=__name__,
-    log_file=None,
-    log_level="INFO",
-    console_level='INFO',
-).get_logger()
+LOGGER = logging.getLogger(__name__)
+
+# Lookup tables hold one entry per 0.1 unit, the precision sensors report with
+LOOKUP_SCALE = 10
+MOISTURE_TABLE_RANGE = (0, 100)      # %
+TEMPERATURE_TABLE_RANGE = (-10, 50)  # °C
+
+# Sensor updates arriving within this window are evaluated once
+EVAL_DEBOUNCE_SECONDS = 0.05
 
 class PlantHealthMonitor(SensorProcessor):
     """Advanced plant health monitoring system that processes soil moisture and temperature data."""
     
-    def __init__(self, config: Dict[str, Any], msg_bus):
-        super().__init__(config["name"], msg_bus)
+    __slots__ = (
+        '_running', '_stop_event', '_faucet_on',
+        'moisture_topic', 'temperature_topic',
+        'watering_hours_topic', 'currently_watering_topic', 'plant_health_topic', 'faucet_command_topic',
+        'moisture_low', 'moisture_optimal', 'temp_low', 'temp_high',
+        '_moisture_table', '_temperature_table',
+        '_pending_eval', '_eval_task', '_subscribe_tasks', '_last_published',
+    )
+    
+    def __init__(self, config: FlowConfig, msg_bus):
+        super().__init__(config.name, msg_bus)
         
         # Running flag
         self._running = False
@@ -23,46 +36,83 @@ class PlantHealthMonitor(SensorProcessor):
         # Faucet control state
         self._faucet_on = False
         
+        # Debounced evaluation and last published (watering_hours, currently_watering, plant_health)
+        self._pending_eval: Optional[asyncio.TimerHandle] = None
+        self._eval_task: Optional[asyncio.Task] = None
+        self._subscribe_tasks: Tuple[asyncio.Task, ...] = ()
+        self._last_published: Optional[Tuple[float, int, int]] = None
+        
         # Input topics
-        self.moisture_topic = config["input"]["soil_moisture_topic"]
-        self.temperature_topic = config["input"]["temperature_topic"]
+        self.moisture_topic = config.input["soil_moisture_topic"]
+        self.temperature_topic = config.input["temperature_topic"]
         
         # Output topics
-        self.watering_hours_topic = config["output"]["watering_hours_topic"]
-        self.currently_watering_topic = config["output"]["currently_watering_topic"]
-        self.plant_health_topic = config["output"]["plant_health_topic"]
+        self.watering_hours_topic = config.output["watering_hours_topic"]
+        self.currently_watering_topic = config.output["currently_watering_topic"]
+        self.plant_health_topic = config.output["plant_health_topic"]
         self.faucet_command_topic = "faucet/command"
         
         # Thresholds
-        self.moisture_low = config["thresholds"]["moisture_low"]
-        self.moisture_optimal = config["thresholds"]["moisture_optimal"]
-        self.temp_low = config["thresholds"]["temp_low"]
-        self.temp_high = config["thresholds"]["temp_high"]
+        self.moisture_low = config.thresholds["moisture_low"]
+        self.moisture_optimal = config.thresholds["moisture_optimal"]
+        self.temp_low = config.thresholds["temp_low"]
+        self.temp_high = config.thresholds["temp_high"]
+        
+        # Precompute the per-sensor terms of the watering/health formulas.
+        # Thresholds differ per monitor, so the tables live on the instance.
+        self._moisture_table = self._build_table(
+            MOISTURE_TABLE_RANGE, self._moisture_base_hours, self._moisture_score
+        )
+        self._temperature_table = self._build_table(
+            TEMPERATURE_TABLE_RANGE, self._temperature_factor, self._temperature_score
+        )
         
-        LOGGER.info(f"[FLOW] {self.name} initialized with:")
-        LOGGER.info(f"[FLOW] Moisture topic: {self.moisture_topic}")
-        LOGGER.info(f"[FLOW] Temperature topic: {self.temperature_topic}")
-        LOGGER.info(f"[FLOW] Thresholds: moisture_low={self.moisture_low}% (turn faucet ON), optimal={self.moisture_optimal}% (turn faucet OFF), temp_low={self.temp_low}°C, temp_high={self.temp_high}°C")
+        LOGGER.info("[FLOW] %s initialized with:", self.name)
+        LOGGER.info("[FLOW] Moisture topic: %s", self.moisture_topic)
+        LOGGER.info("[FLOW] Temperature topic: %s", self.temperature_topic)
+        LOGGER.info(
+            "[FLOW] Thresholds: moisture_low=%s%% (turn faucet ON), optimal=%s%% (turn faucet OFF), temp_low=%s°C, temp_high=%s°C",
+            self.moisture_low, self.moisture_optimal, self.temp_low, self.temp_high
+        )
 
     async def _handle_moisture(self, message: Dict[str, Any]):
         """Handle incoming soil moisture data."""
         try:
             moisture = float(message.get("value", 0))
-            await self.store_value("moisture", moisture)
-            LOGGER.info(f"[FLOW] {self.name} Soil moisture updated: {moisture}%")
-            await self._evaluate_plant_status()
+            self.store_value("moisture", moisture)
+            LOGGER.info("[FLOW] %s Soil moisture updated: %s%%", self.name, moisture)
+            self._schedule_eval()
         except Exception as e:
-            LOGGER.error(f"[FLOW] {self.name} Error handling moisture: {e}")
+            LOGGER.error("[FLOW] %s Error handling moisture: %s", self.name, e)
 
     async def _handle_temperature(self, message: Dict[str, Any]):
         """Handle incoming temperature data."""
         try:
             temperature = float(message.get("value", 0))
-            await self.store_value("temperature", temperature)
-            LOGGER.info(f"[FLOW] {self.name} Temperature updated: {temperature}°C")
+            self.store_value("temperature", temperature)
+            LOGGER.info("[FLOW] %s Temperature updated: %s°C", self.name, temperature)
+            self._schedule_eval()
+        except Exception as e:
+            LOGGER.error("[FLOW] %s Error handling temperature: %s", self.name, e)
+
+    def _schedule_eval(self):
+        """Coalesce sensor updates into a single evaluation after a short delay."""
+        if self._pending_eval is None:
+            self._pending_eval = asyncio.get_running_loop().call_later(
+                EVAL_DEBOUNCE_SECONDS, self._start_eval
+            )
+
+    def _start_eval(self):
+        """Start the debounced evaluation, keeping a reference so it can be cancelled."""
+        self._pending_eval = None
+        self._eval_task = asyncio.create_task(self._do_eval())
+
+    async def _do_eval(self):
+        """Run a scheduled evaluation."""
+        try:
             await self._evaluate_plant_status()
         except Exception as e:
-            LOGGER.error(f"[FLOW] {self.name} Error handling temperature: {e}")
+            LOGGER.error("[FLOW] %s Error evaluating plant status: %s", self.name, e)
 
     async def _evaluate_plant_status(self):
         """Evaluate plant status and publish results."""
@@ -71,49 +121,88 @@ class PlantHealthMonitor(SensorProcessor):
         
         # Wait until we have both values
         if moisture is None or temperature is None:
-            LOGGER.debug(f"[FLOW] {self.name} Waiting for all sensor data...")
+            LOGGER.debug("[FLOW] %s Waiting for all sensor data...", self.name)
             return
         
-        # Calculate watering hours needed (0-24 hours)
-        watering_hours = self._calculate_watering_hours(moisture, temperature)
+        # Watering hours needed (0-24 hours) and plant health (0-100%)
+        watering_hours, plant_health = self._lookup_plant_status(moisture, temperature)
         
         # Determine if currently watering (moisture below optimal)
         currently_watering = 1 if moisture < self.moisture_optimal else 0
         
-        # Calculate plant health (0-100%)
-        plant_health = self._calculate_plant_health(moisture, temperature)
-        
-        # Publish results
-        await self.msg_bus.publish(
-            self.watering_hours_topic,
-            {"value": watering_hours}
-        )
-        
-        await self.msg_bus.publish(
-            self.currently_watering_topic,
-            {"value": currently_watering}
-        )
-        
-        await self.msg_bus.publish(
-            self.plant_health_topic,
-            {"value": plant_health}
-        )
+        # Publish results, unless nothing changed since the last publish
+        status = (watering_hours, currently_watering, plant_health)
+        if status != self._last_published:
+            await asyncio.gather(
+                self.msg_bus.publish_value(self.watering_hours_topic, watering_hours),
+                self.msg_bus.publish_value(self.currently_watering_topic, currently_watering),
+                self.msg_bus.publish_value(self.plant_health_topic, plant_health),
+            )
+            self._last_published = status
         
         # REALISTIC FAUCET-BASED AUTO-WATERING LOGIC
         if moisture <= self.moisture_low and not self._faucet_on:
             # Turn ON faucet - moisture is critically low
-            LOGGER.warning(f"[FLOW] {self.name} CRITICAL MOISTURE ({moisture}%)! Turning faucet ON...")
-            await self.msg_bus.publish(self.faucet_command_topic, {"command": 1})
+            LOGGER.warning("[FLOW] %s CRITICAL MOISTURE (%s%%)! Turning faucet ON...", self.name, moisture)
+            await self.msg_bus.publish(self.faucet_command_topic, {"command": 1}, retain=True)
             self._faucet_on = True
 
         elif moisture >= self.moisture_optimal and self._faucet_on:
             # Turn OFF faucet - target moisture reached
-            LOGGER.info(f"[FLOW] {self.name} Target moisture reached ({moisture}%)! Turning faucet OFF...")
-            await self.msg_bus.publish(self.faucet_command_topic, {"command": 0})
+            LOGGER.info("[FLOW] %s Target moisture reached (%s%%)! Turning faucet OFF...", self.name, moisture)
+            await self.msg_bus.publish(self.faucet_command_topic, {"command": 0}, retain=True)
             self._faucet_on = False
         
-        faucet_status = "ON" if self._faucet_on else "OFF"
-        LOGGER.info(f"[FLOW] {self.name} Status: moisture={moisture}%, watering_hours={watering_hours}h, watering={currently_watering}, health={plant_health}%, faucet={faucet_status}")
+        if LOGGER.isEnabledFor(logging.INFO):
+            faucet_status = "ON" if self._faucet_on else "OFF"
+            LOGGER.info(
+                "[FLOW] %s Status: moisture=%s%%, watering_hours=%sh, watering=%s, health=%s%%, faucet=%s",
+                self.name, moisture, watering_hours, currently_watering, plant_health, faucet_status
+            )
+
+    @staticmethod
+    def _build_table(value_range: Tuple[int, int], *terms) -> List[Optional[Tuple[float, ...]]]:
+        """
+        Evaluate the given per-sensor terms at every 0.1 step of value_range.
+        
+        Entries whose terms fail (e.g. a zero threshold used as a divisor) are
+        stored as None and computed directly on lookup instead.
+        """
+        low, high = value_range
+        table = []
+        for i in range(low * LOOKUP_SCALE, high * LOOKUP_SCALE + 1):
+            try:
+                table.append(tuple(term(i / LOOKUP_SCALE) for term in terms))
+            except ZeroDivisionError:
+                table.append(None)
+        return table
+
+    def _lookup_plant_status(self, moisture: float, temperature: float) -> Tuple[float, int]:
+        """
+        Return (watering_hours, plant_health) using the precomputed tables.
+        
+        Readings that fall off the 0.1 grid, outside the table ranges or on a
+        missing entry are computed directly, so results are identical either way.
+        """
+        moisture_index = round(moisture * LOOKUP_SCALE)
+        temperature_index = round(temperature * LOOKUP_SCALE)
+        m = moisture_index - MOISTURE_TABLE_RANGE[0] * LOOKUP_SCALE
+        t = temperature_index - TEMPERATURE_TABLE_RANGE[0] * LOOKUP_SCALE
+        
+        if (0 <= m < len(self._moisture_table) and 0 <= t < len(self._temperature_table)
+                and moisture_index / LOOKUP_SCALE == moisture
+                and temperature_index / LOOKUP_SCALE == temperature):
+            moisture_entry = self._moisture_table[m]
+            temperature_entry = self._temperature_table[t]
+            if moisture_entry is not None and temperature_entry is not None:
+                base_hours, moisture_score = moisture_entry
+                temp_factor, temp_score = temperature_entry
+                return round(base_hours * temp_factor, 1), min(100, max(0, int(moisture_score + temp_score)))
+        
+        return (
+            self._calculate_watering_hours(moisture, temperature),
+            self._calculate_plant_health(moisture, temperature)
+        )
 
     def _calculate_watering_hours(self, moisture: float, temperature: float) -> float:
         """
@@ -124,26 +213,29 @@ class PlantHealthMonitor(SensorProcessor):
         - If moisture is low, more watering needed
         - Higher temperatures increase water needs
         """
+        return round(self._moisture_base_hours(moisture) * self._temperature_factor(temperature), 1)
+
+    def _moisture_base_hours(self, moisture: float) -> float:
+        """Hours until watering is needed based on soil moisture alone."""
         if moisture >= self.moisture_optimal:
             # Plant is well hydrated
-            base_hours = 24.0
+            return 24.0
         elif moisture >= self.moisture_low:
             # Plant needs water soon
             moisture_ratio = (moisture - self.moisture_low) / (self.moisture_optimal - self.moisture_low)
-            base_hours = 12.0 + (moisture_ratio * 12.0)
+            return 12.0 + (moisture_ratio * 12.0)
         else:
             # Plant needs water urgently
-            base_hours = max(0, moisture / self.moisture_low * 12.0)
-        
-        # Adjust for temperature (higher temp = more water needed sooner)
+            return max(0, moisture / self.moisture_low * 12.0)
+
+    def _temperature_factor(self, temperature: float) -> float:
+        """Scale watering time for temperature (higher temp = more water needed sooner)."""
         if temperature > self.temp_high:
-            temp_factor = 0.7  # Reduce time by 30%
+            return 0.7  # Reduce time by 30%
         elif temperature < self.temp_low:
-            temp_factor = 1.3  # Increase time by 30%
+            return 1.3  # Increase time by 30%
         else:
-            temp_factor = 1.0
-        
-        return round(base_hours * temp_factor, 1)
+            return 1.0
 
     def _calculate_plant_health(self, moisture: float, temperature: float) -> int:
         """
@@ -153,33 +245,35 @@ class PlantHealthMonitor(SensorProcessor):
         - Optimal moisture and temperature = 100%
         - Deviations reduce health
         """
-        # Moisture health score (0-50 points)
+        total_health = int(self._moisture_score(moisture) + self._temperature_score(temperature))
+        return min(100, max(0, total_health))
+
+    def _moisture_score(self, moisture: float) -> float:
+        """Moisture health score (0-50 points)."""
         if moisture >= self.moisture_optimal:
-            moisture_score = 50
+            return 50
         elif moisture >= self.moisture_low:
             moisture_ratio = (moisture - self.moisture_low) / (self.moisture_optimal - self.moisture_low)
-            moisture_score = 25 + (moisture_ratio * 25)
+            return 25 + (moisture_ratio * 25)
         else:
-            moisture_score = max(0, (moisture / self.moisture_low) * 25)
-        
-        # Temperature health score (0-50 points)
+            return max(0, (moisture / self.moisture_low) * 25)
+
+    def _temperature_score(self, temperature: float) -> float:
+        """Temperature health score (0-50 points)."""
         temp_optimal_mid = (self.temp_low + self.temp_high) / 2
         temp_range = self.temp_high - self.temp_low
         
         if self.temp_low <= temperature <= self.temp_high:
             # Within optimal range
             temp_deviation = abs(temperature - temp_optimal_mid) / (temp_range / 2)
-            temp_score = 50 * (1 - temp_deviation * 0.3)
+            return 50 * (1 - temp_deviation * 0.3)
         else:
             # Outside optimal range
             if temperature < self.temp_low:
                 deviation = (self.temp_low - temperature) / self.temp_low
             else:
                 deviation = (temperature - self.temp_high) / self.temp_high
-            temp_score = max(0, 50 * (1 - deviation))
-        
-        total_health = int(moisture_score + temp_score)
-        return min(100, max(0, total_health))
+            return max(0, 50 * (1 - deviation))
 
     async def start(self):
         """Start subscriptions to sensor topics."""
@@ -187,26 +281,36 @@ class PlantHealthMonitor(SensorProcessor):
             self._running = True
             self._stop_event.clear()
             
-            # Subscribe to moisture sensor
-            asyncio.create_task(
-                self.msg_bus.subscribe(self.moisture_topic, self._handle_moisture)
-            )
+            # faucet/command is retained, so overwrite any stale command left on the
+            # broker - otherwise a new subscriber would replay it while _faucet_on is False
+            await self.msg_bus.publish(self.faucet_command_topic, {"command": 0}, retain=True)
+            self._faucet_on = False
             
-            # Subscribe to temperature sensor
-            asyncio.create_task(
-                self.msg_bus.subscribe(self.temperature_topic, self._handle_temperature)
+            # Subscribe to moisture and temperature sensors
+            self._subscribe_tasks = (
+                asyncio.create_task(self.msg_bus.subscribe(self.moisture_topic, self._handle_moisture)),
+                asyncio.create_task(self.msg_bus.subscribe(self.temperature_topic, self._handle_temperature)),
             )
             
-            LOGGER.info(f"[FLOW] {self.name} Started successfully")
+            LOGGER.info("[FLOW] %s Started successfully", self.name)
             
             # Keep the monitor running until stop is called
             await self._stop_event.wait()
             
         except Exception as e:
-            LOGGER.error(f"[FLOW] {self.name} Error starting: {e}")
+            LOGGER.error("[FLOW] %s Error starting: %s", self.name, e)
 
     async def stop(self):
         """Stop the flow."""
         self._running = False
+        if self._pending_eval is not None:
+            self._pending_eval.cancel()
+            self._pending_eval = None
+        if self._eval_task is not None:
+            self._eval_task.cancel()
+            self._eval_task = None
+        for task in self._subscribe_tasks:
+            task.cancel()
+        self._subscribe_tasks = ()
         self._stop_event.set()
-        LOGGER.info(f"[FLOW] {self.name} Stopped")
+        LOGGER.info("[FLOW] %s Stopped", self.name)
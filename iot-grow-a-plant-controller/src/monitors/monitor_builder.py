@@ -1,24 +1,19 @@
-from typing import Dict, Any
+import logging
 from src.monitors.health_analyzer import PlantHealthMonitor
-from src.core.system_logger import SystemLogger
+from src.core.config_loader import FlowConfig
 
-LOGGER = SystemLogger(
-    name=__name__,
-    log_file=None,
-    log_level="INFO",
-    console_level='INFO',
-).get_logger()
+LOGGER = logging.getLogger(__name__)
 
 class MonitorFactory:
     """Factory for creating sensor monitor instances based on configuration."""
     
     @staticmethod
-    def create_monitor(config: Dict[str, Any], msg_bus):
+    def create_monitor(config: FlowConfig, msg_bus):
         """
         Create a sensor monitor instance based on the configuration type.
         
         Args:
-            config: Monitor configuration dictionary
+            config: Monitor configuration
             msg_bus: IoT message broker instance
             
         Returns:
@@ -27,7 +22,7 @@ class MonitorFactory:
         Raises:
             ValueError: If monitor type is not supported
         """
-        monitor_type = config.get("type")
+        monitor_type = config.type
         
         if monitor_type == "plant":
             return PlantHealthMonitor(config, msg_bus)
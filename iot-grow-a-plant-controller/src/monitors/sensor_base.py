@@ -1,24 +1,19 @@
+import logging
 from abc import ABC, abstractmethod
-import asyncio
 from typing import Dict, Any, Optional
 from src.messaging.broker_client import IoTMessageBroker
-from src.core.system_logger import SystemLogger
 
-LOGGER = SystemLogger(
-    name=__name__,
-    log_file=None,
-    log_level="INFO",
-    console_level='INFO',
-).get_logger()
+LOGGER = logging.getLogger(__name__)
 
 class SensorProcessor(ABC):
     """Abstract base class for all sensor data processors."""
     
+    __slots__ = ('name', 'msg_bus', 'monitoring_data')
+    
     def __init__(self, name: str, msg_bus: IoTMessageBroker):
         self.name = name
         self.msg_bus = msg_bus
         self.monitoring_data: Dict[str, float] = {}
-        self.lock = asyncio.Lock()
 
     @abstractmethod
     async def start(self) -> None:
@@ -34,11 +29,10 @@ class SensorProcessor(ABC):
         """Get a value from monitoring storage."""
         return self.monitoring_data.get(key)
 
-    async def store_value(self, key: str, value: float) -> None:
-        """Thread-safe storage of monitored values."""
-        async with self.lock:
-            self.monitoring_data[key] = value
-            LOGGER.debug(f"[FLOW] {self.name} stored {key}: {value}")
+    def store_value(self, key: str, value: float) -> None:
+        """Store a monitored value (single event loop, so no lock is needed)."""
+        self.monitoring_data[key] = value
+        LOGGER.debug("[FLOW] %s stored %s: %s", self.name, key, value)
 
     @staticmethod
     def validate_config(config: Dict[str, Any]) -> bool:
@@ -3,14 +3,45 @@ Test script to simulate sensor data for the plant monitoring system.
 Run this after starting main.py to see the system in action.
 """
 import asyncio
-import json
 import platform
+import orjson
 from aiomqtt import Client
 
+# Topics the controller publishes after evaluating a sensor update
+STATUS_TOPICS = ("plant/watering_hours", "plant/currently_watering", "plant/health")
+STATUS_TIMEOUT = 5  # seconds
+# Quiet period that ends a scenario - longer than the controller's 50ms evaluation debounce
+STATUS_SETTLE = 0.3  # seconds
+
+# Sensor payloads are encoded once up front and reused for every publish
+PAYLOAD = {v: orjson.dumps({"value": v}) for v in (12, 20, 22, 25, 32, 45, 50, 65)}
+
 # Fix for Windows asyncio compatibility
 if platform.system() == "Windows":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
+async def drain_status(messages):
+    """Discard status messages left over from a previous scenario."""
+    for _ in range(len(messages)):
+        await anext(messages)
+
+async def wait_for_status(messages):
+    """Wait for the controller's status to settle and print the last complete set."""
+    status = {}
+    timeout = STATUS_TIMEOUT
+    try:
+        while True:
+            message = await asyncio.wait_for(anext(messages), timeout=timeout)
+            status[message.topic.value] = orjson.loads(message.payload)["value"]
+            timeout = STATUS_SETTLE
+    except asyncio.TimeoutError:
+        pass
+    if len(status) < len(STATUS_TOPICS):
+        print(f"No status update within {STATUS_TIMEOUT}s (unchanged status is not republished)")
+        return
+    print(f"Received: watering_hours={status['plant/watering_hours']}h, "
+          f"watering={status['plant/currently_watering']}, health={status['plant/health']}%")
+
 async def test_plant_system():
     """Simulate various plant conditions."""
     
@@ -21,61 +52,63 @@ async def test_plant_system():
     print("This script will publish test sensor data...\n")
     
     async with Client(hostname="localhost", port=1883) as client:
+        await client.subscribe([(topic, 0) for topic in STATUS_TOPICS])
+        messages = client.messages
         
         # Test 1: Healthy plant
         print("\n[TEST 1] Healthy plant conditions")
         print("-" * 40)
-        await client.publish("sensors/soil_moisture", json.dumps({"value": 65}))
+        await drain_status(messages)
+        await client.publish("sensors/soil_moisture", PAYLOAD[65])
         print("Published: Moisture = 65%")
-        await asyncio.sleep(0.5)
-        await client.publish("sensors/temperature", json.dumps({"value": 22}))
+        await client.publish("sensors/temperature", PAYLOAD[22])
         print("Published: Temperature = 22°C")
         print("Expected: watering_hours=24.0h, watering=0, health=100%")
-        await asyncio.sleep(3)
+        await wait_for_status(messages)
         
         # Test 2: Plant needs water
         print("\n[TEST 2] Plant needs water")
         print("-" * 40)
-        await client.publish("sensors/soil_moisture", json.dumps({"value": 45}))
+        await drain_status(messages)
+        await client.publish("sensors/soil_moisture", PAYLOAD[45])
         print("Published: Moisture = 45%")
-        await asyncio.sleep(0.5)
-        await client.publish("sensors/temperature", json.dumps({"value": 22}))
+        await client.publish("sensors/temperature", PAYLOAD[22])
         print("Published: Temperature = 22°C")
         print("Expected: watering_hours=18.0h, watering=1, health=~75%")
-        await asyncio.sleep(3)
+        await wait_for_status(messages)
         
         # Test 3: Urgent watering needed
         print("\n[TEST 3] Urgent watering needed")
         print("-" * 40)
-        await client.publish("sensors/soil_moisture", json.dumps({"value": 20}))
+        await drain_status(messages)
+        await client.publish("sensors/soil_moisture", PAYLOAD[20])
         print("Published: Moisture = 20%")
-        await asyncio.sleep(0.5)
-        await client.publish("sensors/temperature", json.dumps({"value": 25}))
+        await client.publish("sensors/temperature", PAYLOAD[25])
         print("Published: Temperature = 25°C")
         print("Expected: watering_hours=~8.0h, watering=1, health=~50%")
-        await asyncio.sleep(3)
+        await wait_for_status(messages)
         
         # Test 4: Hot temperature increases water needs
         print("\n[TEST 4] Hot temperature")
         print("-" * 40)
-        await client.publish("sensors/soil_moisture", json.dumps({"value": 50}))
+        await drain_status(messages)
+        await client.publish("sensors/soil_moisture", PAYLOAD[50])
         print("Published: Moisture = 50%")
-        await asyncio.sleep(0.5)
-        await client.publish("sensors/temperature", json.dumps({"value": 32}))
+        await client.publish("sensors/temperature", PAYLOAD[32])
         print("Published: Temperature = 32°C (hot!)")
         print("Expected: watering_hours reduced by 30%, watering=1")
-        await asyncio.sleep(3)
+        await wait_for_status(messages)
         
         # Test 5: Cold temperature reduces water needs
         print("\n[TEST 5] Cold temperature")
         print("-" * 40)
-        await client.publish("sensors/soil_moisture", json.dumps({"value": 50}))
+        await drain_status(messages)
+        await client.publish("sensors/soil_moisture", PAYLOAD[50])
         print("Published: Moisture = 50%")
-        await asyncio.sleep(0.5)
-        await client.publish("sensors/temperature", json.dumps({"value": 12}))
+        await client.publish("sensors/temperature", PAYLOAD[12])
         print("Published: Temperature = 12°C (cold!)")
         print("Expected: watering_hours increased by 30%, watering=1")
-        await asyncio.sleep(3)
+        await wait_for_status(messages)
         
         print("\n" + "=" * 60)
         print("Test completed! Check the main.py output for results.")
@@ -5,33 +5,74 @@ and listens for faucet control commands.
 """
 import paho.mqtt.client as mqtt
 import json
+import logging
+import os
 import time
 import random
 import signal
+import socket
 import sys
+import threading
+from dataclasses import dataclass
+from typing import Optional
 
 # MQTT settings
 MQTT_HOST = "localhost"
 MQTT_PORT = 1883
 
+# Set DEBUG_MQTT=1 to log every publish and delivery
+DEBUG_MQTT = bool(os.environ.get("DEBUG_MQTT"))
+
+logger = logging.getLogger("simulator")
+
+# Exact faucet/command payloads sent by the GUI and the controller - matched without parsing
+_ON = frozenset((b"1", b'"1"', b"1\n", b'{"command":1}'))
+_OFF = frozenset((b"0", b'"0"', b"0\n", b'{"command":0}'))
+
+# Sensor payload {"value": N} - fixed schema, so the bytes are formatted directly without a JSON encoder
+_VALUE_PAYLOAD = b'{"value":%.1f}'
+
+# Linux only: corking the socket sends both sensor publishes of a tick in one TCP segment
+_TCP_CORK = getattr(socket, "TCP_CORK", None)
+
+# Only publish a sensor when it moved at least this much, plus a full heartbeat every N ticks (30s)
+PUBLISH_THRESHOLD = 0.1
+HEARTBEAT_TICKS = 15
+
+@dataclass(slots=True)
+class PlantState:
+    """State of the simulated plant"""
+    last_watered: float  # time.monotonic() seconds - only used for deltas
+    moisture_level: float = 70.0  # Initial moisture level
+    base_temperature: float = 22.0  # Base temperature in Celsius
+    faucet_on: bool = False  # Faucet status
+    liters_per_second: float = 0.5  # Realistic water flow rate
+    last_pub_moisture: Optional[float] = None  # Last published sensor values
+    last_pub_temp: Optional[float] = None
+
+
+# Temperature jitter is pre-generated once and cycled through by iteration.
+# Set SIMULATOR_SEED for a reproducible sequence.
+TEMP_JITTER_SIZE = 2048  # Power of two so the index is a bit mask
+_rng = random.Random(os.environ.get("SIMULATOR_SEED"))
+_TEMP_JITTER = [_rng.uniform(-2, 3) for _ in range(TEMP_JITTER_SIZE)]
+
 # Global state for the plant simulation
-plant_state = {
-    'last_watered': time.time(),
-    'moisture_level': 70.0,  # Initial moisture level
-    'base_temperature': 22.0,  # Base temperature in Celsius
-    'faucet_on': False,  # Faucet status
-    'liters_per_second': 0.5  # Realistic water flow rate
-}
+plant_state = PlantState(last_watered=time.monotonic())
+
+# Fast moisture decrease for demo: ~30-40% per hour depending on temperature.
+# base_temperature is fixed for a run, so the rate is computed once.
+_TEMP_FACTOR = 1.0 + (plant_state.base_temperature - 22) * 0.05  # Hotter = faster evaporation
+_MOISTURE_LOSS_PER_HOUR = 35.0 * _TEMP_FACTOR
 
-# Global flag for clean shutdown
-running = True
+# Set by the signal handler for clean shutdown - waiters wake up immediately
+_stop = threading.Event()
 
 
 def signal_handler(sig, frame):
     """Handle Ctrl+C for graceful shutdown"""
-    global running
     print("\n[SIMULATOR] Shutting down gracefully...")
-    running = False
+    _stop.set()
 
 
 def on_connect(client, userdata, flags, rc, properties=None):
@@ -45,14 +86,19 @@ def on_connect(client, userdata, flags, rc, properties=None):
         print(f"[SIMULATOR] Connection failed with code {rc}")
 
 
-def on_message(client, userdata, message):
-    """Handle incoming MQTT messages (faucet commands)"""
+def on_faucet_command(client, userdata, message):
+    """Handle faucet/command messages (routed by paho via message_callback_add)"""
     try:
         print(f"[SIMULATOR] Received MQTT message on topic: {message.topic}, payload: {message.payload}")
-        if message.topic == "faucet/command":
-            payload_str = message.payload.decode()
-
-            # Handle multiple formats: JSON dict {"command": 1}, JSON int "1", or plain string "1"
+        payload = message.payload
+        if payload in _ON:
+            command = 1
+        elif payload in _OFF:
+            command = 0
+        else:
+            payload_str = payload.decode()
+
+            # Handle other formats: JSON dict {"command": 1}, JSON int "1", or plain string "1"
             try:
                 data = json.loads(payload_str)
                 # Check if it's a dict with "command" key or just an integer
@@ -65,111 +111,142 @@ def on_message(client, userdata, message):
                 # Fall back to plain string format
                 command = int(payload_str)
 
-            plant_state['faucet_on'] = (command == 1)
-            status = "ON" if command == 1 else "OFF"
-            print(f"[SIMULATOR] Faucet command received: {command} -> Faucet turned {status}")
-    except Exception as e:
-        print(f"[SIMULATOR] Error processing faucet command: {e}")
-        import traceback
-        traceback.print_exc()
+        plant_state.faucet_on = (command == 1)
+        status = "ON" if command == 1 else "OFF"
+        print(f"[SIMULATOR] Faucet command received: {command} -> Faucet turned {status}")
+    except Exception:
+        logger.exception("[SIMULATOR] Error processing faucet command")
 
 
 def on_publish(client, userdata, mid, reason_code=None, properties=None):
-    """Callback when message is published"""
-    print(f"[SIMULATOR] Message {mid} delivered")
+    """Callback when message is published (only registered with DEBUG_MQTT)"""
+    logger.debug("[SIMULATOR] Message %s delivered", mid)
+
+
+def service_network(client, deadline):
+    """Run the MQTT network loop on this thread until the deadline (or shutdown)"""
+    while not _stop.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        # Short select timeout so a stop request is noticed within 0.1s
+        if client.loop(timeout=min(remaining, 0.1)) != mqtt.MQTT_ERR_SUCCESS:
+            # Connection lost - reconnect (the loop_start thread used to do this for us)
+            try:
+                client.reconnect()
+            except OSError:
+                _stop.wait(min(remaining, 1.0))
 
 
 def run_simulation():
     """Main simulation loop"""
-    global running
-
     # Set up MQTT client
     client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    # Telemetry is published with QoS 0; keep paho from throttling or capping sends regardless
+    client.max_inflight_messages_set(1000)
+    client.max_queued_messages_set(0)  # 0 = unlimited
     client.on_connect = on_connect
-    client.on_message = on_message
-    client.on_publish = on_publish
+    client.message_callback_add("faucet/command", on_faucet_command)
+    if DEBUG_MQTT:
+        # QoS 0 has no delivery acknowledgement, so only track publishes when debugging
+        client.on_publish = on_publish
 
     try:
         print(f"[SIMULATOR] Connecting to MQTT broker at {MQTT_HOST}:{MQTT_PORT}...")
         client.connect(MQTT_HOST, MQTT_PORT, 60)
-        client.loop_start()
 
         # Wait for connection to establish
-        time.sleep(1)
+        service_network(client, time.monotonic() + 1)
 
         iteration = 0
-        while running:
+        next_tick = time.monotonic()
+        state = plant_state  # Local alias - avoids a global lookup on every access
+        while not _stop.is_set():
             try:
                 iteration += 1
+                now = time.monotonic()
                 print(f"\n[SIMULATOR] === Iteration {iteration} ===")
 
                 # Check if faucet is on for watering
-                faucet_on = plant_state['faucet_on']
-                liters_per_sec = plant_state['liters_per_second']
+                faucet_on = state.faucet_on
+                liters_per_sec = state.liters_per_second
+                base_temperature = state.base_temperature
 
                 if faucet_on:
                     # WATERING MODE: Moisture increases based on flow rate
                     # 0.5 liters/sec = ~5% moisture increase per 2 seconds
                     moisture_increase_per_cycle = (liters_per_sec * 2) * 5  # 5% per 0.5L * 2sec
-                    new_moisture = min(100, plant_state['moisture_level'] + moisture_increase_per_cycle)
-                    plant_state['moisture_level'] = new_moisture
+                    new_moisture = min(100, state.moisture_level + moisture_increase_per_cycle)
+                    state.moisture_level = new_moisture
                     current_moisture = round(new_moisture, 1)
 
                     # Reset the watering timestamp - we're actively watering now
-                    plant_state['last_watered'] = time.time()
+                    state.last_watered = now
 
                     print(f"[SIMULATOR] FAUCET ON - Adding water: +{moisture_increase_per_cycle:.1f}% | Current: {current_moisture}% | Flow: {liters_per_sec}L/s")
                 else:
                     # NORMAL MODE: Moisture decreases (evaporation + plant consumption)
-                    time_since_watering = time.time() - plant_state['last_watered']
+                    time_since_watering = now - state.last_watered
                     hours_since_watering = time_since_watering / 3600
 
-                    # Fast moisture decrease for demo: ~30-40% per hour depending on temperature
-                    temp = plant_state['base_temperature']
-                    temp_factor = 1.0 + (temp - 22) * 0.05  # Hotter = faster evaporation
-                    moisture_loss_per_hour = 35.0 * temp_factor
-
                     # Calculate current moisture (minimum 10%)
-                    moisture = max(10, plant_state['moisture_level'] - (moisture_loss_per_hour * hours_since_watering))
+                    moisture = max(10, state.moisture_level - (_MOISTURE_LOSS_PER_HOUR * hours_since_watering))
 
                     # Update the plant state with current moisture
-                    plant_state['moisture_level'] = moisture
+                    state.moisture_level = moisture
                     current_moisture = round(moisture, 1)
 
                     print(f"[SIMULATOR] Faucet OFF - Moisture decreasing: {current_moisture}% | Hours since watering: {hours_since_watering:.2f}h")
 
                 # Temperature varies slightly throughout the day (±3°C)
-                temperature = plant_state['base_temperature'] + random.uniform(-2, 3)
-
-                # Publish sensor data to MQTT
-                moisture_payload = json.dumps({"value": current_moisture})
-                temp_payload = json.dumps({"value": round(temperature, 1)})
-
-                result1 = client.publish("sensors/soil_moisture", moisture_payload)
-                result2 = client.publish("sensors/temperature", temp_payload)
-
-                print(f"[SIMULATOR] Publishing to MQTT:")
-                print(f"  - sensors/soil_moisture = {current_moisture}% (msg_id: {result1.mid})")
-                print(f"  - sensors/temperature = {round(temperature, 1)}°C (msg_id: {result2.mid})")
-
-                # Sleep for 2 seconds before next iteration
-                time.sleep(2)
+                temperature = round(base_temperature + _TEMP_JITTER[iteration & (TEMP_JITTER_SIZE - 1)], 1)
+
+                heartbeat = iteration % HEARTBEAT_TICKS == 0
+                last_moisture = state.last_pub_moisture
+                last_temp = state.last_pub_temp
+                publish_moisture = heartbeat or last_moisture is None or round(abs(current_moisture - last_moisture), 1) >= PUBLISH_THRESHOLD
+                publish_temp = heartbeat or last_temp is None or round(abs(temperature - last_temp), 1) >= PUBLISH_THRESHOLD
+
+                # publish() writes to the socket right away, so cork it while both readings go out
+                sock = client.socket() if publish_moisture and publish_temp and _TCP_CORK else None
+                if sock is not None:
+                    sock.setsockopt(socket.IPPROTO_TCP, _TCP_CORK, 1)
+                try:
+                    # Publish changed readings at QoS 0 - never wait_for_publish(), it would stall the tick
+                    if publish_moisture:
+                        result = client.publish("sensors/soil_moisture", _VALUE_PAYLOAD % current_moisture,
+                                                qos=0, retain=False)
+                        state.last_pub_moisture = current_moisture
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("[SIMULATOR] Published sensors/soil_moisture = %s%% (msg_id: %s)",
+                                         current_moisture, result.mid)
+
+                    if publish_temp:
+                        result = client.publish("sensors/temperature", _VALUE_PAYLOAD % temperature,
+                                                qos=0, retain=False)
+                        state.last_pub_temp = temperature
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("[SIMULATOR] Published sensors/temperature = %s°C (msg_id: %s)",
+                                         temperature, result.mid)
+                finally:
+                    if sock is not None:
+                        sock.setsockopt(socket.IPPROTO_TCP, _TCP_CORK, 0)
+
+                # Handle MQTT traffic until the next 2-second tick so the period doesn't drift with work time
+                next_tick += 2.0
+                service_network(client, next_tick)
 
             except KeyboardInterrupt:
                 break
-            except Exception as e:
-                print(f"[SIMULATOR] Simulation loop error: {e}")
-                import traceback
-                traceback.print_exc()
-                time.sleep(5)
-
-    except Exception as e:
-        print(f"[SIMULATOR] Connection error: {e}")
-        import traceback
-        traceback.print_exc()
+            except Exception:
+                logger.exception("[SIMULATOR] Simulation loop error")
+                service_network(client, time.monotonic() + 5)
+                next_tick = time.monotonic()
+
+    except Exception:
+        logger.exception("[SIMULATOR] Connection error")
     finally:
         print("[SIMULATOR] Stopping simulation...")
-        client.loop_stop()
         client.disconnect()
         print("[SIMULATOR] Disconnected from MQTT broker")
 
@@ -179,6 +256,9 @@ if __name__ == "__main__":
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
+    logging.basicConfig(level=logging.DEBUG if DEBUG_MQTT else logging.INFO,
+                        format="%(message)s", stream=sys.stdout)
+
     print("=" * 60)
     print("MODBUS CLIENT SIMULATOR")
     print("=" * 60)
@@ -14,6 +14,17 @@ from datetime import datetime
 MQTT_HOST = "localhost"
 MQTT_PORT = 1883
 
+# Payloads shorter than this are printed raw instead of re-formatted as indented JSON
+PRETTY_PRINT_MIN_LENGTH = 80
+
+# Emoji and color per top-level topic segment
+_STYLE = {
+    "sensors": ("🌡️", "\033[94m"),    # Blue
+    "plant": ("🌱", "\033[92m"),      # Green
+    "actuators": ("💧", "\033[93m"),  # Yellow
+}
+_DEFAULT_STYLE = ("📨", "\033[95m")   # Magenta
+
 def on_connect(client, userdata, flags, rc, properties=None):
     """Callback when connected to MQTT broker"""
     if rc == 0:
@@ -34,27 +45,20 @@ def on_message(client, userdata, message):
     timestamp = datetime.now().strftime("%H:%M:%S")
     topic = message.topic
     
-    try:
-        # Try to parse as JSON
-        payload = json.loads(message.payload.decode())
-        payload_str = json.dumps(payload, indent=2)
-    except:
-        # If not JSON, display as raw string
-        payload_str = message.payload.decode()
-    
-    # Color-coded output based on topic
-    if "sensors" in topic:
-        emoji = "🌡️"
-        color = "\033[94m"  # Blue
-    elif "plant" in topic:
-        emoji = "🌱"
-        color = "\033[92m"  # Green
-    elif "actuators" in topic:
-        emoji = "💧"
-        color = "\033[93m"  # Yellow
+    raw = message.payload.decode("utf-8", "replace")
+    if len(raw) < PRETTY_PRINT_MIN_LENGTH:
+        # Short payloads (e.g. {"value": 42.0}) are already readable as-is
+        payload_str = raw
     else:
-        emoji = "📨"
-        color = "\033[95m"  # Magenta
+        try:
+            # Try to pretty-print as JSON
+            payload_str = json.dumps(json.loads(raw), indent=2)
+        except ValueError:  # json.JSONDecodeError is a ValueError
+            # If not JSON, display as raw string
+            payload_str = raw
+    
+    # Color-coded output based on the topic's first segment
+    emoji, color = _STYLE.get(topic.split("/", 1)[0], _DEFAULT_STYLE)
     
     reset = "\033[0m"
     